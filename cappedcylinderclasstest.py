@@ -5,14 +5,58 @@ from vispy.scene.cameras import TurntableCamera
 
 use(gl='gl+')
 
+class ReservedInstancedMesh(InstancedMesh):
+    """
+    InstancedMesh whose instance buffers are allocated at a reserved capacity
+    and patched in place with set_subdata (glBufferSubData), so appending
+    instances only uploads the new range. Slots past the live count hold a
+    zero transform: they collapse to a point and draw nothing.
+    """
+
+    @property
+    def capacity(self):
+        return self._instance_positions_vbo.size
+
+    def reserve(self, positions, transforms, colors, count):
+        """(Re)allocate the instance buffers at len(positions) and upload all."""
+        self.instance_positions  = positions
+        self.instance_transforms = transforms
+        self.instance_colors     = colors
+        self._set_live(positions, transforms, count)
+
+    def upload_range(self, start, stop, positions, transforms, colors):
+        """Upload instances [start:stop) into the existing buffers."""
+        if stop > start:
+            self._instance_positions_vbo.set_subdata(positions[start:stop],
+                                                     offset=start)
+            for j, vbo in enumerate(self._instance_transforms_vbos):
+                vbo.set_subdata(
+                    np.ascontiguousarray(transforms[start:stop, :, j]),
+                    offset=start)
+            self._instance_colors_vbo.set_subdata(colors[start:stop],
+                                                  offset=start)
+        self._set_live(positions, transforms, stop)
+
+    def _set_live(self, positions, transforms, count):
+        # bounds only consider the live instances; instance_colors keeps the
+        # ColorArray of the last reserve(), the GPU buffer is authoritative
+        self._instance_positions  = positions[:count]
+        self._instance_transforms = transforms[:count]
+        self._bounds_changed()
+        self.update()
+
+
 class CappedCylinderCollection(scene.Node):
     # Static geometry (built once)
     _side_vertices = None
     _side_indices  = None
     _disk_vertices = None
     _disk_indices  = None
+    _vertices      = None
+    _indices       = None
 
-    def __init__(self, parent=None, cylinder_segments=32, disk_slices=32):
+    def __init__(self, parent=None, cylinder_segments=32, disk_slices=32,
+                 capacity=64):
         super().__init__(parent=parent)
 
         # 1) Build side‐only cylinder mesh if needed
@@ -25,68 +69,101 @@ class CappedCylinderCollection(scene.Node):
             circle_pts = np.stack([np.cos(angles),
                                    np.sin(angles)], axis=1)
             bottom_ring = np.column_stack([circle_pts,
-                                           -0.5 * np.ones(cylinder_segments,
-                                                          dtype=np.float32)])
+                                           np.full(cylinder_segments, -0.5,
+                                                   dtype=np.float32)])
             top_ring    = np.column_stack([circle_pts,
-                                           +0.5 * np.ones(cylinder_segments,
-                                                          dtype=np.float32)])
+                                           np.full(cylinder_segments, +0.5,
+                                                   dtype=np.float32)])
             CappedCylinderCollection._side_vertices = np.vstack([bottom_ring,
                                                                   top_ring])
 
-            side_idx = []
-            for i in range(cylinder_segments):
-                ni = (i + 1) % cylinder_segments
-                side_idx.append([i,
-                                 i + cylinder_segments,
-                                 ni])
-                side_idx.append([ni,
-                                 i + cylinder_segments,
-                                 ni + cylinder_segments])
-            CappedCylinderCollection._side_indices = np.array(side_idx,
-                                                              dtype=np.uint32)
-
-        # 2) Build disk‐cap mesh if needed
+            i  = np.arange(cylinder_segments, dtype=np.uint32)
+            ni = (i + 1) % cylinder_segments
+            side_idx = np.empty((2 * cylinder_segments, 3), dtype=np.uint32)
+            side_idx[0::2] = np.stack([i,
+                                       i + cylinder_segments,
+                                       ni], axis=1)
+            side_idx[1::2] = np.stack([ni,
+                                       i + cylinder_segments,
+                                       ni + cylinder_segments], axis=1)
+            CappedCylinderCollection._side_indices = side_idx
+
+        # 2) Build disk‐cap mesh if needed: bottom (z=-0.5) and top (z=+0.5)
+        #    disks baked into one mesh, so a single cap instance scaled by
+        #    diag(r, r, h) puts both caps at the ends of the side wall
         if CappedCylinderCollection._disk_vertices is None:
             angles = np.linspace(0.0,
                                  2.0 * np.pi,
                                  disk_slices,
                                  endpoint=False,
                                  dtype=np.float32)
-            circle_pts = np.stack([np.cos(angles),
-                                   np.sin(angles)], axis=1)
-            verts2d = np.vstack([[0.0, 0.0], circle_pts])
-            verts3d = np.zeros((verts2d.shape[0], 3),
-                               dtype=np.float32)
-            verts3d[:, :2] = verts2d
-            CappedCylinderCollection._disk_vertices = verts3d
-
-            disk_idx = []
-            for i in range(1, disk_slices):
-                disk_idx.append([0, i, i+1])
-            disk_idx.append([0, disk_slices, 1])
-            CappedCylinderCollection._disk_indices = np.array(disk_idx,
-                                                              dtype=np.uint32)
-
-        # 3) Create the two InstancedMesh visuals with EMPTY instance arrays
-        empty_positions = np.zeros((0, 3), dtype=np.float32)
-        empty_transforms = np.zeros((0, 3, 3), dtype=np.float32)
-
-        self._side_mesh = InstancedMesh(
-            CappedCylinderCollection._side_vertices,
-            CappedCylinderCollection._side_indices,
-            instance_positions=empty_positions,
-            instance_transforms=empty_transforms,
-            parent=self
-        )
-        self._disk_mesh = InstancedMesh(
-            CappedCylinderCollection._disk_vertices,
-            CappedCylinderCollection._disk_indices,
-            instance_positions=empty_positions,
-            instance_transforms=empty_transforms,
+            # centre + rim per disk, written straight into one float32 array
+            n = disk_slices + 1
+            disk_verts = np.zeros((2 * n, 3), dtype=np.float32)
+            disk_verts[1:n, 0] = np.cos(angles)
+            disk_verts[1:n, 1] = np.sin(angles)
+            disk_verts[n:, :2] = disk_verts[:n, :2]
+            disk_verts[:n, 2] = -0.5
+            disk_verts[n:, 2] = +0.5
+            CappedCylinderCollection._disk_vertices = disk_verts
+
+            # triangle fan; the last rim vertex wraps back to 1
+            i = np.arange(1, disk_slices + 1, dtype=np.uint32)
+            disk_idx = np.stack([np.zeros_like(i),
+                                 i,
+                                 i % disk_slices + 1], axis=1)
+            CappedCylinderCollection._disk_indices = np.vstack([
+                disk_idx,
+                disk_idx + n])
+
+        # 3) Combine side wall and caps into one mesh, so every cylinder is
+        #    one instance of a single InstancedMesh (one draw, one set of
+        #    instance buffers per refresh)
+        if CappedCylinderCollection._vertices is None:
+            side_v = CappedCylinderCollection._side_vertices
+            CappedCylinderCollection._vertices = np.vstack([
+                side_v,
+                CappedCylinderCollection._disk_vertices])
+            CappedCylinderCollection._indices = np.vstack([
+                CappedCylinderCollection._side_indices,
+                CappedCylinderCollection._disk_indices + len(side_v)])
+
+        # 4) Create the InstancedMesh with instance buffers reserved at full
+        #    capacity; every slot starts with a zero transform, i.e.
+        #    invisible until a cylinder is written to it
+        self._mesh = ReservedInstancedMesh(
+            CappedCylinderCollection._vertices,
+            CappedCylinderCollection._indices,
+            instance_positions=np.zeros((capacity, 3), dtype=np.float32),
+            instance_transforms=np.zeros((capacity, 3, 3), dtype=np.float32),
+            instance_colors=np.zeros((capacity, 4), dtype=np.float32),
             parent=self
         )
 
-        self._instances = []
+        # 5) Per-instance data as growable SoA buffers; only [:count] is live
+        #    and only [dirty_start:count] still has to be uploaded
+        self._count = 0
+        self._cap   = capacity
+        self._dirty_start = 0
+        self._positions = np.zeros((capacity, 3), dtype=np.float32)
+        self._radii     = np.zeros(capacity, dtype=np.float32)
+        self._heights   = np.zeros(capacity, dtype=np.float32)
+        self._colors    = np.zeros((capacity, 4), dtype=np.float32)
+        # Scratch instance transforms, reused across refreshes
+        self._transforms = np.zeros((capacity, 3, 3), dtype=np.float32)
+
+    def _reserve(self, n):
+        """Grow the instance buffers (doubling) so they hold at least n."""
+        if n <= self._cap:
+            return
+        while self._cap < n:
+            self._cap *= 2
+        for name in ('_positions', '_radii', '_heights', '_colors',
+                     '_transforms'):
+            old = getattr(self, name)
+            new = np.zeros((self._cap,) + old.shape[1:], dtype=old.dtype)
+            new[:self._count] = old[:self._count]
+            setattr(self, name, new)
 
     def add_cylinder(self, position, radius, height, color):
         """
@@ -94,60 +171,64 @@ class CappedCylinderCollection(scene.Node):
         radius:   float
         height:   float
         color:    array-like RGBA
+
+        Queued only; call flush() once after a batch of adds.
+        """
+        self._reserve(self._count + 1)
+        i = self._count
+        self._positions[i] = position
+        self._radii[i]     = radius
+        self._heights[i]   = height
+        self._colors[i]    = color
+        self._count += 1
+
+    def add_cylinders(self, positions, radii, heights, colors):
         """
-        self._instances.append((
-            np.array(position, dtype=np.float32),
-            float(radius),
-            float(height),
-            np.array(color, dtype=np.float32),
-        ))
+        positions: (N,3)
+        radii:     (N,)
+        heights:   (N,)
+        colors:    (N,4) RGBA
+
+        Appends all N cylinders and uploads them with a single refresh.
+        """
+        positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+        n = len(positions)
+        self._reserve(self._count + n)
+        new = slice(self._count, self._count + n)
+        self._positions[new] = positions
+        self._radii[new]     = radii
+        self._heights[new]   = heights
+        self._colors[new]    = colors
+        self._count += n
+        self._refresh_instances()
+
+    def flush(self):
+        """Upload everything queued by add_cylinder() to the GPU."""
         self._refresh_instances()
 
     def _refresh_instances(self):
-        count = len(self._instances)
-
-        # — Side instances —
-        side_positions = np.vstack([inst[0] for inst in self._instances])
-        radii_arr      = np.array([inst[1] for inst in self._instances],
-                                  dtype=np.float32)
-        heights_arr    = np.array([inst[2] for inst in self._instances],
-                                  dtype=np.float32)
-        side_colors    = np.vstack([inst[3] for inst in self._instances])
-
-        side_transforms = np.repeat(np.eye(3, dtype=np.float32)[None, ...],
-                                    count, axis=0)
-        side_transforms[:, 0, 0] = radii_arr
-        side_transforms[:, 1, 1] = radii_arr
-        side_transforms[:, 2, 2] = heights_arr
-
-        self._side_mesh.instance_positions  = side_positions
-        self._side_mesh.instance_transforms = side_transforms
-        self._side_mesh.instance_colors     = side_colors
-        self._side_mesh.update()
-
-        # — Cap instances (two per cylinder) —
-        cap_positions = np.zeros((2*count, 3), dtype=np.float32)
-        cap_transforms = np.repeat(np.eye(3, dtype=np.float32)[None, ...],
-                                   2*count, axis=0)
-        cap_colors = np.zeros((2*count, 4), dtype=np.float32)
-
-        for idx, (pos, rad, ht, col) in enumerate(self._instances):
-            bi, ti = 2*idx, 2*idx+1
-            cap_positions[bi] = pos + np.array([0, 0, -0.5 * ht],
-                                               dtype=np.float32)
-            cap_positions[ti] = pos + np.array([0, 0, +0.5 * ht],
-                                               dtype=np.float32)
-
-            cap_transforms[bi] = np.diag([rad, rad, 1.0])
-            cap_transforms[ti] = np.diag([rad, rad, 1.0])
-
-            cap_colors[bi] = col
-            cap_colors[ti] = col
-
-        self._disk_mesh.instance_positions  = cap_positions
-        self._disk_mesh.instance_transforms = cap_transforms
-        self._disk_mesh.instance_colors     = cap_colors
-        self._disk_mesh.update()
+        count = self._count
+        start = self._dirty_start
+        if start == count:
+            return
+
+        # Instances are append-only, so only [start:count] needs transforms;
+        # earlier ones are kept in the scratch buffer (copied on growth).
+        # Unused slots keep a zero transform so they draw nothing.
+        new = slice(start, count)
+        transforms = self._transforms
+        transforms[new, 0, 0] = self._radii[new]
+        transforms[new, 1, 1] = self._radii[new]
+        transforms[new, 2, 2] = self._heights[new]
+
+        # Only the range added since the last refresh is uploaded, unless
+        # the buffers grew and have to be reallocated.
+        if self._mesh.capacity != self._cap:
+            self._mesh.reserve(self._positions, transforms, self._colors, count)
+        else:
+            self._mesh.upload_range(start, count,
+                                    self._positions, transforms, self._colors)
+        self._dirty_start = count
 
 
 # — Usage Example —
@@ -160,15 +241,16 @@ view.camera = TurntableCamera(fov=45,
                               up='+z')
 
 collection = CappedCylinderCollection(parent=view.scene)
-for _ in range(50):
-    pos = np.random.uniform(-5, 5, 3)
-    pos[2] = 0
-    collection.add_cylinder(
-        position=pos,
-        radius=np.random.uniform(0.3, 1.0),
-        height=np.random.uniform(1.0, 3.0),
-        color=np.append(np.random.uniform(0.2, 1.0, 3), 0.8)
-    )
+M = 50
+positions = np.random.uniform(-5, 5, (M, 3))
+positions[:, 2] = 0
+collection.add_cylinders(
+    positions=positions,
+    radii=np.random.uniform(0.3, 1.0, M),
+    heights=np.random.uniform(1.0, 3.0, M),
+    colors=np.column_stack([np.random.uniform(0.2, 1.0, (M, 3)),
+                            np.full(M, 0.8)])
+)
 
 if __name__ == '__main__':
     app.run()
@@ -1,48 +1,162 @@
 import numpy as np
 from vispy import scene, use
-from vispy.scene.visuals import InstancedMesh
+from vispy.color import ColorArray
+from vispy.gloo import VertexBuffer
+from vispy.visuals.mesh import MeshVisual
 from scipy.spatial.transform import Rotation
 
 # Enable instancing
 use(gl='gl+')
 
+_QUAT_VERTEX_SHADER = """
+// per-instance: shift, rotation quaternion (x, y, z, w), scale (radius, height)
+attribute vec3 shift;
+attribute vec4 quat;
+attribute vec2 scale;
+
+varying vec4 v_base_color;
+
+vec3 qrot(vec4 q, vec3 v) {
+    return v + 2.0 * cross(q.xyz, cross(q.xyz, v) + q.w * v);
+}
+
+void main() {
+    v_base_color = $color_transform($base_color) * $instance_color;
+
+    vec3 pos_scaled = $to_vec4($position).xyz * vec3(scale.x, scale.x, scale.y);
+    gl_Position = $transform($to_vec4(qrot(quat, pos_scaled) + shift));
+}
+"""
+
+
+class QuatInstancedMeshVisual(MeshVisual):
+    """
+    InstancedMesh variant for rotated, radially symmetric shapes: each
+    instance is a position, a unit quaternion and an (r, h) scale (r on XY,
+    h on Z), i.e. 36 bytes of instance attributes instead of the 48 taken by
+    a position plus a full 3x3 transform. The rotation is rebuilt per vertex
+    in the shader.
+    """
+
+    _shaders = {
+        'vertex': _QUAT_VERTEX_SHADER,
+        'fragment': MeshVisual._shaders['fragment'],
+    }
+
+    def __init__(self, *args, instance_positions, instance_quats,
+                 instance_scales, instance_colors, **kwargs):
+        self._instance_positions = None
+        self._instance_scales = None
+        self._positions_vbo = None
+        self._quats_vbo  = None
+        self._scales_vbo = None
+        self._colors_vbo = None
+        super().__init__(*args, **kwargs)
+        self.set_instances(instance_positions, instance_quats,
+                           instance_scales, instance_colors)
+
+    def set_instances(self, positions, quats, scales, colors):
+        """Upload (M,3) positions, (M,4) quats, (M,2) scales, (M,4) colors."""
+        self._instance_positions = np.asarray(positions, dtype=np.float32)
+        self._instance_scales = np.asarray(scales, dtype=np.float32)
+        self._positions_vbo = VertexBuffer(self._instance_positions, divisor=1)
+        self._quats_vbo  = VertexBuffer(np.ascontiguousarray(quats, dtype=np.float32),
+                                        divisor=1)
+        self._scales_vbo = VertexBuffer(self._instance_scales, divisor=1)
+        self._colors_vbo = VertexBuffer(np.ascontiguousarray(ColorArray(colors).rgba),
+                                        divisor=1)
+        self._bounds_changed()
+        self.mesh_data_changed()
+
+    def _update_data(self):
+        self.shared_program.vert['instance_color'] = self._colors_vbo
+        self.shared_program['shift'] = self._positions_vbo
+        self.shared_program['quat']  = self._quats_vbo
+        self.shared_program['scale'] = self._scales_vbo
+        super()._update_data()
+
+    def _compute_bounds(self, axis, view):
+        if self._bounds is None or self._instance_positions is None:
+            return None
+        if axis >= 3:
+            return (0, 0)
+        # Rotation keeps lengths, so the farthest scaled template corner
+        # bounds every instance in any direction
+        ext = np.abs(np.asarray(self._bounds, dtype=np.float32)).max(axis=1)
+        s = self._instance_scales
+        reach = np.sqrt(s[:, 0]**2 * (ext[0]**2 + ext[1]**2) + (s[:, 1] * ext[2])**2)
+        pos = self._instance_positions[:, axis]
+        return (float((pos - reach).min()), float((pos + reach).max()))
+
+
+QuatInstancedMesh = scene.visuals.create_visual_node(QuatInstancedMeshVisual)
+
 class CappedCylinderCollection(scene.Node):
     """
-    A deferred collection of capped cylinders. Mesh visuals are created on first refresh,
+    A deferred collection of capped cylinders. The mesh visual is created on first refresh,
     then updated on subsequent refresh() calls following refresh-instanced semantics.
+    Side walls and both caps share one mesh, so each cylinder is a single instance
+    described by a position, a quaternion and an (r, h) scale.
     """
     # Shared geometry, built once
     _side_vertices = None
     _side_indices  = None
     _disk_vertices = None
     _disk_indices  = None
+    _vertices      = None
+    _indices       = None
 
-    def __init__(self, parent=None, cylinder_segments=32, disk_slices=32):
+    def __init__(self, parent=None, cylinder_segments=32, disk_slices=32,
+                 capacity=64):
         super().__init__(parent=parent)
-        # Queue of instances: (pos, radius, height, color, orientation)
-        self._instances = []
-        # Placeholder for visuals, created in refresh()
-        self._side_mesh = None
-        self._disk_mesh = None
+        # Queued instances as growable SoA buffers; only [:count] is live
+        self._count = 0
+        self._cap   = capacity
+        self._positions = np.zeros((capacity, 3), dtype=np.float32)
+        self._scales    = np.zeros((capacity, 2), dtype=np.float32)  # (r, h)
+        self._colors    = np.zeros((capacity, 4), dtype=np.float32)
+        self._oris      = np.zeros((capacity, 3, 3), dtype=np.float32)
+        # Quaternions (x, y, z, w) of the orientations; [:quat_count] are
+        # converted already, the rest is done in one batch by refresh()
+        self._quats     = np.zeros((capacity, 4), dtype=np.float32)
+        self._quat_count = 0
+        # Placeholder for the visual, created in refresh()
+        self._mesh = None
         # Store parameters for geometry generation
         self._segs = cylinder_segments
         self._slices = disk_slices
 
+    def _reserve(self, n):
+        """
+        Grow the instance buffers (doubling) so they hold at least n instances.
+        """
+        if n <= self._cap:
+            return
+        while self._cap < n:
+            self._cap *= 2
+        for name in ('_positions', '_scales', '_colors', '_oris', '_quats'):
+            old = getattr(self, name)
+            new = np.zeros((self._cap,) + old.shape[1:], dtype=old.dtype)
+            new[:self._count] = old[:self._count]
+            setattr(self, name, new)
+
     def add_cylinder(self, position, radius, height, color, orientation=None):
         """
         Queue a single capped cylinder instance. Call refresh() to build/update visuals.
         """
-        pos = np.array(position, dtype=np.float32)
-        col = np.array(color, dtype=np.float32)
-        ori = (np.array(orientation, dtype=np.float32)
-               if orientation is not None else np.eye(3, dtype=np.float32))
-        self._instances.append((pos, float(radius), float(height), col, ori))
+        self._reserve(self._count + 1)
+        i = self._count
+        self._positions[i] = position
+        self._scales[i]    = (radius, height)
+        self._colors[i]    = color
+        self._oris[i]      = orientation if orientation is not None else np.eye(3)
+        self._count += 1
 
     def refresh(self):
         """
         Build or update the instanced meshes in one batch. Creates visuals lazily.
         """
-        M = len(self._instances)
+        M = self._count
         if M == 0:
             return
         # Generate shared geometry if needed
@@ -51,82 +165,66 @@ class CappedCylinderCollection(scene.Node):
                                  endpoint=False, dtype=np.float32)
             circle_pts = np.stack([np.cos(angles), np.sin(angles)], axis=1)
             bottom = np.column_stack([circle_pts,
-                                      -0.5 * np.ones(self._segs)])
+                                      np.full(self._segs, -0.5, dtype=np.float32)])
             top    = np.column_stack([circle_pts,
-                                      +0.5 * np.ones(self._segs)])
-            CappedCylinderCollection._side_vertices = np.vstack([bottom, top]).astype(np.float32)
-            idx = []
-            for i in range(self._segs):
-                ni = (i + 1) % self._segs
-                idx.append([i, i + self._segs, ni])
-                idx.append([ni, i + self._segs, ni + self._segs])
-            CappedCylinderCollection._side_indices = np.array(idx, dtype=np.uint32)
+                                      np.full(self._segs, +0.5, dtype=np.float32)])
+            CappedCylinderCollection._side_vertices = np.vstack([bottom, top])
+            i  = np.arange(self._segs, dtype=np.uint32)
+            ni = (i + 1) % self._segs
+            idx = np.empty((2 * self._segs, 3), dtype=np.uint32)
+            idx[0::2] = np.stack([i, i + self._segs, ni], axis=1)
+            idx[1::2] = np.stack([ni, i + self._segs, ni + self._segs], axis=1)
+            CappedCylinderCollection._side_indices = idx
+        # Caps: bottom (z=-0.5) and top (z=+0.5) disks baked into one mesh,
+        # so one cap instance per cylinder shares the side instance data
         if CappedCylinderCollection._disk_vertices is None:
             angles = np.linspace(0.0, 2.0 * np.pi, self._slices,
                                  endpoint=False, dtype=np.float32)
-            circle_pts = np.stack([np.cos(angles), np.sin(angles)], axis=1)
-            verts2d = np.vstack([[0.0, 0.0], circle_pts])
-            verts3d = np.zeros((verts2d.shape[0], 3), dtype=np.float32)
-            verts3d[:, :2] = verts2d
-            CappedCylinderCollection._disk_vertices = verts3d
-            idx = [[0, i, i + 1] for i in range(1, self._slices)]
-            idx.append([0, self._slices, 1])
-            CappedCylinderCollection._disk_indices = np.array(idx, dtype=np.uint32)
-        # Build instance arrays
-        side_pos = np.vstack([inst[0] for inst in self._instances])
-        radii    = np.array([inst[1] for inst in self._instances], dtype=np.float32)
-        heights  = np.array([inst[2] for inst in self._instances], dtype=np.float32)
-        colors   = np.vstack([inst[3] for inst in self._instances])
-        oris     = [inst[4] for inst in self._instances]
-        # Transforms for sides
-        side_xf = np.zeros((M, 3, 3), dtype=np.float32)
-        for i in range(M):
-            scale = np.diag([radii[i], radii[i], heights[i]]).astype(np.float32)
-            side_xf[i] = oris[i] @ scale
-        # Lazy creation of visuals
-        if self._side_mesh is None:
-            self._side_mesh = InstancedMesh(
-                CappedCylinderCollection._side_vertices,
+            n = self._slices + 1
+            disk_verts = np.zeros((2 * n, 3), dtype=np.float32)
+            disk_verts[1:n, 0] = np.cos(angles)
+            disk_verts[1:n, 1] = np.sin(angles)
+            disk_verts[n:, :2] = disk_verts[:n, :2]
+            disk_verts[:n, 2] = -0.5
+            disk_verts[n:, 2] = +0.5
+            CappedCylinderCollection._disk_vertices = disk_verts
+            i = np.arange(1, self._slices + 1, dtype=np.uint32)
+            idx = np.stack([np.zeros_like(i), i, i % self._slices + 1], axis=1)
+            CappedCylinderCollection._disk_indices = np.vstack([idx, idx + n])
+        # Side wall + caps combined: one draw, one set of instance buffers
+        if CappedCylinderCollection._vertices is None:
+            side_v = CappedCylinderCollection._side_vertices
+            CappedCylinderCollection._vertices = np.vstack([
+                side_v, CappedCylinderCollection._disk_vertices])
+            CappedCylinderCollection._indices = np.vstack([
                 CappedCylinderCollection._side_indices,
-                instance_positions=side_pos,
-                instance_transforms=side_xf,
+                CappedCylinderCollection._disk_indices + len(side_v)])
+        # Convert the orientations queued since the last refresh, all at once;
+        # instances are append-only so earlier quaternions stay valid
+        q0 = self._quat_count
+        if q0 < M:
+            self._quats[q0:M] = Rotation.from_matrix(self._oris[q0:M]).as_quat()
+            self._quat_count = M
+        # Instance arrays: no per-cylinder 3x3 transform, the shader applies
+        # qrot(q, v * (r, r, h)) + position
+        pos    = self._positions[:M]
+        quats  = self._quats[:M]
+        scales = self._scales[:M]
+        colors = self._colors[:M]
+        # Lazy creation of the visual
+        if self._mesh is None:
+            self._mesh = QuatInstancedMesh(
+                CappedCylinderCollection._vertices,
+                CappedCylinderCollection._indices,
+                instance_positions=pos,
+                instance_quats=quats,
+                instance_scales=scales,
                 instance_colors=colors,
                 parent=self
             )
         else:
-            self._side_mesh.instance_positions  = side_pos
-            self._side_mesh.instance_transforms = side_xf
-            self._side_mesh.instance_colors     = colors
-            self._side_mesh.update()
-        # Caps: 2*M instances
-        cap_pos = np.zeros((2*M, 3), dtype=np.float32)
-        cap_xf  = np.zeros((2*M, 3, 3), dtype=np.float32)
-        cap_col = np.zeros((2*M, 4), dtype=np.float32)
-        for i, (pos, rad, ht, col, ori) in enumerate(self._instances):
-            bi, ti = 2*i, 2*i + 1
-            bottom = ori @ np.array([0, 0, -0.5 * ht], dtype=np.float32)
-            top    = ori @ np.array([0, 0, +0.5 * ht], dtype=np.float32)
-            cap_pos[bi] = pos + bottom
-            cap_pos[ti] = pos + top
-            scale2 = np.diag([rad, rad, 1.0]).astype(np.float32)
-            cap_xf[bi] = ori @ scale2
-            cap_xf[ti] = ori @ scale2
-            cap_col[bi] = col
-            cap_col[ti] = col
-        if self._disk_mesh is None:
-            self._disk_mesh = InstancedMesh(
-                CappedCylinderCollection._disk_vertices,
-                CappedCylinderCollection._disk_indices,
-                instance_positions=cap_pos,
-                instance_transforms=cap_xf,
-                instance_colors=cap_col,
-                parent=self
-            )
-        else:
-            self._disk_mesh.instance_positions  = cap_pos
-            self._disk_mesh.instance_transforms = cap_xf
-            self._disk_mesh.instance_colors     = cap_col
-            self._disk_mesh.update()
+            self._mesh.set_instances(pos, quats, scales, colors)
+            self._mesh.update()
 
 
 # Simple test when run as a script
@@ -17,25 +17,28 @@ top    = np.column_stack([ring, np.full(segments, +0.5, dtype=np.float32)])
 cyl_verts = np.vstack([bottom, top])               # (2*segments,3)
 
 # two triangles per quad around the side
-cyl_faces = []
-for i in range(segments):
-    ni = (i + 1) % segments
-    cyl_faces.append([i,       i+segments, ni])
-    cyl_faces.append([ni,      i+segments, ni+segments])
-cyl_faces = np.array(cyl_faces, dtype=np.uint32)
+i  = np.arange(segments, dtype=np.uint32)
+ni = (i + 1) % segments
+cyl_faces = np.empty((2*segments, 3), dtype=np.uint32)
+cyl_faces[0::2] = np.stack([i,  i+segments, ni], axis=1)
+cyl_faces[1::2] = np.stack([ni, i+segments, ni+segments], axis=1)
 
-# ─── Build unit-disk mesh for caps ─────────────────────────────────────────
+# ─── Build cap mesh: bottom disk at z=-0.5, top disk at z=+0.5 ─────────────
+# Baking both caps into one mesh lets each cylinder use a single cap instance
+# with the same transform as its side wall.
 N = 32
 phi = np.linspace(0, 2*np.pi, N, endpoint=False, dtype=np.float32)
-circle2d = np.column_stack([np.cos(phi), np.sin(phi)])
-disk_verts2d = np.vstack([[0,0], circle2d])       # (N+1,2)
-disk_verts = np.zeros((len(disk_verts2d), 3), np.float32)
-disk_verts[:, :2] = disk_verts2d
+disk_verts = np.zeros((2*(N+1), 3), np.float32)  # centre + rim, per disk
+disk_verts[1:N+1, 0] = np.cos(phi)
+disk_verts[1:N+1, 1] = np.sin(phi)
+disk_verts[:N+1, 2]  = -0.5
+disk_verts[N+1:, :2] = disk_verts[:N+1, :2]
+disk_verts[N+1:, 2]  = +0.5
 
-disk_faces = np.vstack(
-    [[0, i, i+1] for i in range(1, N)] +
-    [[0, N, 1]]
-).astype(np.uint32)
+# triangle fan; the last rim vertex wraps back to 1
+i = np.arange(1, N+1, dtype=np.uint32)
+fan = np.stack([np.zeros_like(i), i, i % N + 1], axis=1)
+disk_faces = np.vstack([fan, fan + N+1])
 
 # ─── Instance data ─────────────────────────────────────────────────────────
 M = 100
@@ -47,24 +50,11 @@ heights = np.random.uniform(1.0, 3.0, M).astype(np.float32)
 colors  = np.random.uniform(0.3, 1.0, (M, 4)).astype(np.float32)
 
 # 3×3 transforms for cylinders: scale X/Y by radius, Z by height
-cyl_transforms = np.repeat(np.eye(3, dtype=np.float32)[None], M, axis=0)
-cyl_transforms[:, 0, 0] = radii
-cyl_transforms[:, 1, 1] = radii
-cyl_transforms[:, 2, 2] = heights
-
-# Prepare caps: bottom & top per cylinder
-cap_positions  = np.zeros((2*M, 3), dtype=np.float32)
-cap_transforms = np.repeat(np.eye(3, dtype=np.float32)[None], 2*M, axis=0)
-cap_colors     = np.zeros((2*M, 4), dtype=np.float32)
-
-for i, (pos, r, h, col) in enumerate(zip(positions, radii, heights, colors)):
-    bi, ti = 2*i, 2*i+1
-    cap_positions[bi] = pos + (0, 0, -0.5*h)
-    cap_positions[ti] = pos + (0, 0, +0.5*h)
-    cap_transforms[bi] = np.diag([r, r, 1.0])
-    cap_transforms[ti] = np.diag([r, r, 1.0])
-    cap_colors[bi] = col
-    cap_colors[ti] = col
+cyl_transforms = np.zeros((M, 3, 3), dtype=np.float32)
+diag = np.einsum('mii->mi', cyl_transforms)        # writable diagonal view
+diag[:, 0] = radii
+diag[:, 1] = radii
+diag[:, 2] = heights
 
 # ─── Set up canvas & TurntableCamera ───────────────────────────────────────
 canvas = scene.SceneCanvas(keys='interactive', show=True, bgcolor='black')
@@ -80,12 +70,12 @@ cyl_mesh = InstancedMesh(
     instance_colors=colors,
     parent=view.scene
 )
-# 2) caps
+# 2) caps, one instance per cylinder sharing the side instance data
 cap_mesh = InstancedMesh(
     disk_verts, disk_faces,
-    instance_positions=cap_positions,
-    instance_transforms=cap_transforms,
-    instance_colors=cap_colors,
+    instance_positions=positions,
+    instance_transforms=cyl_transforms,
+    instance_colors=colors,
     parent=view.scene
 )
 
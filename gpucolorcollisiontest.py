@@ -2,7 +2,6 @@ import numpy as np
 from vispy import app, scene, use
 from vispy.geometry.generation import create_sphere
 from vispy.scene.visuals import InstancedMesh
-from copy import deepcopy
 
 # 1) Setup VisPy + Qt6
 use(app='pyqt6', gl='gl+')
@@ -25,9 +24,10 @@ centers = np.array([
 N = len(centers)
 
 # 4) Instance transforms & original colors (blue)
-instance_transforms = np.repeat(np.eye(3, dtype=np.float32)[None, :, :], N, axis=0)
+instance_transforms = np.zeros((N, 3, 3), dtype=np.float32)
+np.einsum('nii->ni', instance_transforms)[:] = 1.0   # identity via diagonal view
 orig_colors = np.tile(np.array([0.5, 0.5, 1.0, 1.0], dtype=np.float32)[None, :], (N, 1))
-highlight_colors = deepcopy(orig_colors)
+highlight_colors = orig_colors.copy()
 
 # 5) Create the instanced blue spheres
 spheres = InstancedMesh(
@@ -42,17 +42,25 @@ spheres = InstancedMesh(
 selected = [False for _ in range (N)]
 
 # 7) Generate exact ID-colors by encoding (i+1) into RGB bytes,
-#    normalized to [0,1] so they fit in RGBA8:
-id_colors = []
-for i in range(N):
-    idx = i + 1
-    # encode low byte in red channel
-    r = (idx & 0xFF) / 255.0
-    # for completeness, support >255 ids by using green, blue channels
-    g = ((idx >> 8) & 0xFF) / 255.0
-    b = ((idx >> 16) & 0xFF) / 255.0
-    id_colors.append([r, g, b, 1.0])
-id_colors = np.array(id_colors, dtype=np.float32)
+#    normalized to [0,1] so they fit in RGBA8. Viewing the little-endian
+#    uint32 ids as bytes gives low byte -> red, then green, blue (>255 ids)
+ids = np.arange(1, N + 1, dtype='<u4')
+id_colors = np.empty((N, 4), dtype=np.float32)
+id_colors[:, :3] = ids.view(np.uint8).reshape(N, 4)[:, :3] / np.float32(255.0)
+id_colors[:, 3] = 1.0
+
+# 8) Pick-pass spheres: same geometry and instances, drawn with the ID colors.
+#    Only made visible for the 1×1 pick render, so a click never has to
+#    swap (and re-upload) the visible spheres' color buffer
+pick_spheres = InstancedMesh(
+    vertices=verts,
+    faces=faces,
+    instance_positions=centers,
+    instance_transforms=instance_transforms,
+    instance_colors=id_colors,
+    parent=view.scene
+)
+pick_spheres.visible = False
 
 _click = None
 DRAG_THRESHOLD = 5  # pixels squared
@@ -94,10 +102,11 @@ def on_mouse_release(event):
         print(f"[DEBUG]   Sphere {idx} expected ID byte: {expected_byte}")
 
     # DEBUG STEP 5: render 1×1 pick pass
-    old_cols = spheres.instance_colors.copy()
-    spheres.instance_colors = id_colors
+    spheres.visible = False
+    pick_spheres.visible = True
     img = canvas.render(region=(x_fb, y_fb, 1, 1), alpha=False, bgcolor=(0, 0, 0, 0))
-    spheres.instance_colors = old_cols
+    pick_spheres.visible = False
+    spheres.visible = True
     canvas.update()
 
     # DEBUG STEP 6: actual sampled bytes
@@ -0,0 +1,65 @@
+"""
+Numba kernels for neuroninstancedtest.py.
+
+build_segment_transforms() is JIT-compiled on first call. Running
+
+    python neuron_kernels.py
+
+AOT-compiles it (numba.pycc) into the _neuron_kernels extension next to this
+file; when that module is importable it is used instead, so start-up pays no
+LLVM compile cost.
+"""
+import os
+
+import numpy as np
+from numba import njit, prange
+
+
+def _segment_transforms(points, radius, out_pos, out_xf):
+    """Positions (N,3) and R @ diag(R, R, L) transforms (N,3,3) for the
+    N = len(points)-1 segments between consecutive points, in one fused
+    pass with no temporaries."""
+    R = 2.0*radius                      # 0.5*(d0 + d1), d0 = d1 = 2*radius
+    for k in prange(out_pos.shape[0]):
+        vx = points[k+1, 0] - points[k, 0]
+        vy = points[k+1, 1] - points[k, 1]
+        vz = points[k+1, 2] - points[k, 2]
+        L = np.sqrt(vx*vx + vy*vy + vz*vz)
+        for i in range(3):
+            out_pos[k, i] = 0.5*(points[k, i] + points[k+1, i])
+        # axis = z x v_norm = (-ny, nx, 0), |axis| = sin, nz = cos
+        ax, ay = -vy/L, vx/L
+        s = np.sqrt(ax*ax + ay*ay)
+        c = vz/L
+        if s < 1e-6:
+            r00, r01, r02 = 1.0, 0.0, 0.0
+            r10, r11, r12 = 0.0, 1.0, 0.0
+            r20, r21, r22 = 0.0, 0.0, 1.0
+        else:
+            # Rodrigues with unit axis (kx, ky, 0): I + s*K + (1-c)*K@K
+            kx, ky = ax/s, ay/s
+            oc = 1.0 - c
+            r00, r01, r02 = 1.0 + oc*(kx*kx - 1.0), oc*kx*ky, s*ky
+            r10, r11, r12 = oc*kx*ky, 1.0 + oc*(ky*ky - 1.0), -s*kx
+            r20, r21, r22 = -s*ky, s*kx, c
+        out_xf[k, 0, 0], out_xf[k, 0, 1], out_xf[k, 0, 2] = r00*R, r01*R, r02*L
+        out_xf[k, 1, 0], out_xf[k, 1, 1], out_xf[k, 1, 2] = r10*R, r11*R, r12*L
+        out_xf[k, 2, 0], out_xf[k, 2, 1], out_xf[k, 2, 2] = r20*R, r21*R, r22*L
+
+
+try:
+    from _neuron_kernels import build_segment_transforms
+except ImportError:
+    build_segment_transforms = njit(parallel=True, fastmath=True,
+                                    cache=True)(_segment_transforms)
+
+
+if __name__ == '__main__':
+    from numba.pycc import CC
+
+    cc = CC('_neuron_kernels')
+    cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+    # pycc has no parallel target: prange compiles as a plain (vectorized) loop
+    cc.export('build_segment_transforms',
+              'void(f4[:, ::1], f4, f4[:, ::1], f4[:, :, ::1])')(_segment_transforms)
+    cc.compile()
@@ -12,7 +12,13 @@ use(app='pyqt6', gl='gl+')
 # 3) Now import the rest of Vispy (it will pick up the above settings)
 from vispy import app, scene
 from vispy.geometry import create_cylinder
-from scipy.spatial.transform import Rotation
+
+# Numba kernels are optional: without numba the vectorized NumPy path is used
+try:
+    from neuron_kernels import build_segment_transforms
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
 
 # --- mock-data setup as before ---
 N = 30
@@ -20,31 +26,46 @@ radius = 0.05
 t = np.linspace(0, 4*np.pi, N+1)
 points = np.vstack([np.sin(t), np.zeros_like(t), np.cos(t)]).T
 
-segments = []
-for i in range(N):
-    p0, p1 = points[i], points[i+1]
-    d0 = d1 = radius*2
-    segments.append((p0, p1, d0, d1))
-
-instance_positions  = np.zeros((N, 3), np.float32)
-instance_transforms = np.zeros((N, 3, 3), np.float32)
-
-for k, (p0, p1, d0, d1) in enumerate(segments):
+# --- per-segment instance data, all segments at once (Rodrigues) ---
+def segment_instances(points, radius):
+    """Positions (N,3) and R @ diag(R, R, L) transforms (N,3,3) for the
+    N = len(points)-1 segments between consecutive points."""
+    p0, p1 = points[:-1], points[1:]
+    n = len(p0)
+    d0 = d1 = np.full(n, radius*2)
     v = p1 - p0
-    L = np.linalg.norm(v)
+    L = np.linalg.norm(v, axis=1)
     R = 0.5*(d0 + d1)
     z = np.array([0.0, 0.0, 1.0])
-    v_norm = v / L
-    axis = np.cross(z, v_norm)
-    if np.linalg.norm(axis) < 1e-6:
-        Rmat = np.eye(3)
-    else:
-        angle = np.arccos(np.dot(z, v_norm))
-        axis /= np.linalg.norm(axis)
-        Rmat = Rotation.from_rotvec(axis * angle).as_matrix()
-    S = np.diag([R, R, L])
-    instance_transforms[k] = Rmat @ S
-    instance_positions[k]  = (p0 + p1) / 2
+    v_norm = v / L[:, None]
+    axis = np.cross(z, v_norm)              # |axis| = sin(angle)
+    sin_t = np.linalg.norm(axis, axis=1)
+    cos_t = v_norm[:, 2]                    # dot(z, v_norm)
+    collinear = sin_t < 1e-6
+    k = axis / np.where(collinear, 1.0, sin_t)[:, None]
+    K = np.zeros((n, 3, 3))
+    K[:, 0, 1], K[:, 0, 2] = -k[:, 2],  k[:, 1]
+    K[:, 1, 0], K[:, 1, 2] =  k[:, 2], -k[:, 0]
+    K[:, 2, 0], K[:, 2, 1] = -k[:, 1],  k[:, 0]
+    Rmat = (np.eye(3) + sin_t[:, None, None]*K
+            + (1.0 - cos_t)[:, None, None]*(K @ K))
+    Rmat[collinear] = np.eye(3)
+    S = np.zeros((n, 3, 3))
+    S[:, 0, 0] = R
+    S[:, 1, 1] = R
+    S[:, 2, 2] = L
+    positions  = (0.5*(p0 + p1)).astype(np.float32)
+    transforms = np.einsum('nij,njk->nik', Rmat, S).astype(np.float32)
+    return positions, transforms
+
+if HAVE_NUMBA:
+    instance_positions  = np.zeros((N, 3), np.float32)
+    instance_transforms = np.zeros((N, 3, 3), np.float32)
+    # the AOT build takes C-contiguous float32 only
+    build_segment_transforms(np.ascontiguousarray(points, dtype=np.float32),
+                             radius, instance_positions, instance_transforms)
+else:
+    instance_positions, instance_transforms = segment_instances(points, radius)
 
 # --- build the Vispy scene ---
 canvas = scene.SceneCanvas(keys='interactive', bgcolor='white', show=False)
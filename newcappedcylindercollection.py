@@ -10,11 +10,29 @@ from scipy.spatial.transform import Rotation
 # Enable instanced rendering
 use(app='pyqt6', gl='gl+')
 
+# Numba is optional: without it the transforms use a broadcast multiply
+try:
+    from numba import njit, prange
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+if HAVE_NUMBA:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _build_side_transforms(R, r, h, out):
+        """out[k] = R[k] @ diag(r[k], r[k], h[k]), in one parallel pass."""
+        for k in prange(out.shape[0]):
+            for i in range(3):
+                out[k, i, 0] = R[k, i, 0] * r[k]
+                out[k, i, 1] = R[k, i, 1] * r[k]
+                out[k, i, 2] = R[k, i, 2] * h[k]
+        return out
+
 class CappedCylinderCollection(scene.Node):
     """
-    A collection of capped cylinders rendered via two InstancedMesh:
-      - one for the side-walls (two rings at z=±0.5)
-      - one for both end-caps (bottom & top disks)
+    A collection of capped cylinders rendered via one InstancedMesh whose
+    geometry is the side wall (two rings at z=±0.5) plus the bottom and top
+    cap disks baked at z=±0.5, so every cylinder is a single instance.
     
     All per-instance data is passed in up front.
     """
@@ -22,6 +40,8 @@ class CappedCylinderCollection(scene.Node):
     _side_indices  = None
     _disk_vertices = None
     _disk_indices  = None
+    _vertices      = None
+    _indices       = None
 
     def __init__(self,
                  positions:    np.ndarray,   # (N,3)
@@ -45,6 +65,10 @@ class CappedCylinderCollection(scene.Node):
         self.heights      = heights.astype(np.float32)
         self.orientations = orientations.astype(np.float32)
         self.colors       = colors.astype(np.float32)
+        # whether orientations changed since they were last checked for
+        # being all identity (axis-aligned cylinders need no rotation)
+        self._orient_dirty = True
+        self._axis_aligned = False
 
         self._segs   = cylinder_segments
         self._slices = disk_slices
@@ -55,92 +79,97 @@ class CappedCylinderCollection(scene.Node):
                                      endpoint=False, dtype=np.float32)
             circle_pts = np.stack([np.cos(angles), np.sin(angles)], axis=1)
             bottom     = np.column_stack([circle_pts,
-                                          -0.5 * np.ones(self._segs, dtype=np.float32)])
+                                          np.full(self._segs, -0.5, dtype=np.float32)])
             top        = np.column_stack([circle_pts,
-                                          +0.5 * np.ones(self._segs, dtype=np.float32)])
-            verts = np.vstack([bottom, top]).astype(np.float32)
+                                          np.full(self._segs, +0.5, dtype=np.float32)])
+            verts = np.vstack([bottom, top])
 
-            idx = []
-            for i in range(self._segs):
-                ni = (i + 1) % self._segs
-                idx.append([i,           i + self._segs,   ni])
-                idx.append([ni,          i + self._segs,   ni + self._segs])
-            inds = np.array(idx, dtype=np.uint32)
+            i  = np.arange(self._segs, dtype=np.uint32)
+            ni = (i + 1) % self._segs
+            inds = np.empty((2 * self._segs, 3), dtype=np.uint32)
+            inds[0::2] = np.stack([i,  i + self._segs, ni], axis=1)
+            inds[1::2] = np.stack([ni, i + self._segs, ni + self._segs], axis=1)
 
             CappedCylinderCollection._side_vertices = verts
             CappedCylinderCollection._side_indices  = inds
 
-        side_verts = CappedCylinderCollection._side_vertices
-        side_faces = CappedCylinderCollection._side_indices
-
-        # ─── 2) compute per-instance side transforms ───────────────────
-        side_transforms = np.zeros((self.N, 3, 3), dtype=np.float32)
-        for k in range(self.N):
-            S = np.diag([self.radii[k], self.radii[k], self.heights[k]]).astype(np.float32)
-            side_transforms[k] = self.orientations[k] @ S
-
-        # ─── 3) create side-wall InstancedMesh ─────────────────────────
-        self._side_mesh = InstancedMesh(
-            vertices=side_verts,
-            faces=side_faces,
-            instance_positions=self.positions,
-            instance_transforms=side_transforms,
-            instance_colors=self.colors,
-            parent=self
-        )
-
-        # ─── 4) build shared disk geometry for caps ────────────────────
+        # ─── 2) build shared cap geometry: bottom disk at z=-0.5, top at +0.5 ───
         if CappedCylinderCollection._disk_vertices is None:
             angles = np.linspace(0.0, 2.0*np.pi, self._slices,
                                  endpoint=False, dtype=np.float32)
-            circle_pts = np.stack([np.cos(angles), np.sin(angles)], axis=1)
-            verts2d = np.vstack([[0.0, 0.0], circle_pts]).astype(np.float32)
-            verts3d = np.zeros((verts2d.shape[0], 3), dtype=np.float32)
-            verts3d[:, :2] = verts2d
-            idx = [[0, i, i+1] for i in range(1, self._slices)]
-            idx.append([0, self._slices, 1])
+            n = self._slices + 1
+            verts3d = np.zeros((2 * n, 3), dtype=np.float32)
+            verts3d[1:n, 0] = np.cos(angles)
+            verts3d[1:n, 1] = np.sin(angles)
+            verts3d[n:, :2] = verts3d[:n, :2]
+            verts3d[:n, 2]  = -0.5
+            verts3d[n:, 2]  = +0.5
+            # triangle fan; the last rim vertex wraps back to 1
+            i = np.arange(1, self._slices + 1, dtype=np.uint32)
+            idx = np.stack([np.zeros_like(i), i, i % self._slices + 1], axis=1)
             CappedCylinderCollection._disk_vertices = verts3d
-            CappedCylinderCollection._disk_indices  = np.array(idx, dtype=np.uint32)
-
-        disk_verts = CappedCylinderCollection._disk_vertices
-        disk_faces = CappedCylinderCollection._disk_indices
-
-        # ─── 5) compute per-instance cap positions & transforms ────────
-        # local Z axis for each instance
-        axes    = self.orientations[:, :, 2]            # (N,3)
-        half_h  = (self.heights * 0.5)[:, None]         # (N,1)
-
-        pos0 = self.positions - axes * half_h
-        pos1 = self.positions + axes * half_h
-
-        cap_transforms = np.zeros((self.N, 3, 3), dtype=np.float32)
-        for k in range(self.N):
-            S2 = np.diag([self.radii[k], self.radii[k], 1.0]).astype(np.float32)
-            cap_transforms[k] = self.orientations[k] @ S2
-
-        cap_positions  = np.vstack([pos0, pos1])        # (2N,3)
-        cap_transforms = np.vstack([cap_transforms, cap_transforms])  # (2N,3,3)
-        cap_colors     = np.vstack([self.colors, self.colors])        # (2N,4)
-
-        # ─── 6) create cap-disk InstancedMesh ─────────────────────────
-        self._cap_mesh = InstancedMesh(
-            vertices=disk_verts,
-            faces=disk_faces,
-            instance_positions=cap_positions,
-            instance_transforms=cap_transforms,
-            instance_colors=cap_colors,
+            CappedCylinderCollection._disk_indices  = np.vstack([idx, idx + n])
+
+        # ─── 3) combine side wall and caps into one mesh ──────────────
+        if CappedCylinderCollection._vertices is None:
+            side_v = CappedCylinderCollection._side_vertices
+            CappedCylinderCollection._vertices = np.vstack([
+                side_v, CappedCylinderCollection._disk_vertices])
+            CappedCylinderCollection._indices = np.vstack([
+                CappedCylinderCollection._side_indices,
+                CappedCylinderCollection._disk_indices + len(side_v)])
+
+        # ─── 4) compute per-instance transforms ───────────────────────
+        # R @ diag(r, r, h) == R with its columns scaled by (r, r, h); the
+        # baked caps land at the ends of the side wall under the same scale.
+        # Two preallocated buffers, alternated by set_transforms()
+        self._xf_bufs  = (np.empty((self.N, 3, 3), dtype=np.float32),
+                          np.empty((self.N, 3, 3), dtype=np.float32))
+        self._xf_front = 0
+        transforms = self._compute_transforms(self._xf_bufs[0])
+
+        # ─── 5) create the single InstancedMesh (one draw call) ───────
+        self._mesh = InstancedMesh(
+            vertices=CappedCylinderCollection._vertices,
+            faces=CappedCylinderCollection._indices,
+            instance_positions=self.positions,
+            instance_transforms=transforms,
+            instance_colors=self.colors,
             parent=self
         )
 
+    def _compute_transforms(self, out):
+        """Write the (N,3,3) instance transforms, orientation @ diag(r, r, h)."""
+        if self._orient_dirty:
+            self._axis_aligned = bool((self.orientations == np.eye(3, dtype=np.float32)).all())
+            self._orient_dirty = False
+        if self._axis_aligned:
+            # no rotation: just the diagonal, skipping the 9-term multiply
+            out.fill(0.0)
+            diag = np.einsum('nii->ni', out)    # writable diagonal view
+            diag[:, 0] = self.radii
+            diag[:, 1] = self.radii
+            diag[:, 2] = self.heights
+            return out
+        if HAVE_NUMBA:
+            return _build_side_transforms(self.orientations, self.radii,
+                                          self.heights, out)
+        # one batched column scaling, the same as
+        # np.einsum('nij,nj->nij', R, scale) or np.matmul(R, diag-stack)
+        scale = np.stack([self.radii, self.radii, self.heights], axis=1)
+        return np.multiply(self.orientations, scale[:, None, :], out=out)
+
     def set_colors(self, new_colors: np.ndarray):
         """Update per-segment colors (shape must be (N,4))."""
         assert new_colors.shape == (self.N, 4)
-        self.colors = new_colors.astype(np.float32)
-        self._side_mesh.instance_colors = self.colors
-        self._side_mesh.update()
-        cap_cols = np.vstack([self.colors, self.colors])
-        self._cap_mesh.instance_colors = cap_cols
-        self._cap_mesh.update()
+        # gloo binds every vertex attribute as GL_FLOAT, so colors stay
+        # float32; the saving is skipping uploads that change nothing
+        new_colors = np.asarray(new_colors, dtype=np.float32)
+        if np.array_equal(new_colors, self.colors):
+            return
+        self.colors[:] = new_colors
+        self._mesh.instance_colors = self.colors
+        self._mesh.update()
 
     def set_transforms(self,
                        positions:    np.ndarray = None,
@@ -149,8 +178,11 @@ class CappedCylinderCollection(scene.Node):
                        orientations: np.ndarray = None):
         """
         Update any of positions/radii/heights/orientations (must match N).
-        Recomputes instance data for sides and caps.
+        Only the instance attributes whose inputs changed are re-uploaded.
         """
+        positions_dirty  = positions is not None
+        transforms_dirty = (radii is not None or heights is not None
+                            or orientations is not None)
         if positions is not None:
             assert positions.shape == (self.N, 3)
             self.positions = positions.astype(np.float32)
@@ -163,30 +195,17 @@ class CappedCylinderCollection(scene.Node):
         if orientations is not None:
             assert orientations.shape == (self.N, 3, 3)
             self.orientations = orientations.astype(np.float32)
-
-        # recompute and upload side data
-        side_t = np.zeros((self.N,3,3), dtype=np.float32)
-        for k in range(self.N):
-            S = np.diag([self.radii[k], self.radii[k], self.heights[k]]).astype(np.float32)
-            side_t[k] = self.orientations[k] @ S
-        self._side_mesh.instance_positions   = self.positions
-        self._side_mesh.instance_transforms  = side_t
-        self._side_mesh.update()
-
-        # recompute and upload caps
-        axes   = self.orientations[:,:,2]
-        half_h = (self.heights * 0.5)[:,None]
-        p0 = self.positions - axes * half_h
-        p1 = self.positions + axes * half_h
-        cap_t = np.zeros((self.N,3,3), dtype=np.float32)
-        for k in range(self.N):
-            S2 = np.diag([self.radii[k], self.radii[k], 1.0]).astype(np.float32)
-            cap_t[k] = self.orientations[k] @ S2
-        cap_pos = np.vstack([p0, p1])
-        cap_trans = np.vstack([cap_t, cap_t])
-        self._cap_mesh.instance_positions   = cap_pos
-        self._cap_mesh.instance_transforms  = cap_trans
-        self._cap_mesh.update()
+            self._orient_dirty = True
+
+        if positions_dirty:
+            self._mesh.instance_positions = self.positions
+        if transforms_dirty:
+            # ping-pong: never rewrite the buffer handed to the mesh last time
+            self._xf_front ^= 1
+            self._mesh.instance_transforms = self._compute_transforms(
+                self._xf_bufs[self._xf_front])
+        if positions_dirty or transforms_dirty:
+            self._mesh.update()
 
 
 # Simple test when run as a script
@@ -1,3 +1,4 @@
+from functools import lru_cache
 import numpy as np
 from vispy import scene, app, use
 from vispy.scene.visuals import InstancedMesh
@@ -6,19 +7,24 @@ from vispy.scene.cameras import TurntableCamera
 # Enable the “gl+” backend for instancing support
 use(gl='gl+')
 
-# 1) Build a unit‐circle mesh in the XY plane
+# 1) Unit‐circle mesh in the XY plane + 2) triangle‐fan faces, built once
+#    per slice count; read-only so every scene can share the same arrays
+@lru_cache(maxsize=None)
+def _disk_mesh(slices):
+    theta = np.linspace(0, 2*np.pi, slices, endpoint=False, dtype=np.float32)
+    verts = np.zeros((slices+1, 3), dtype=np.float32)              # centre + rim, z=0
+    verts[1:, 0] = np.cos(theta)
+    verts[1:, 1] = np.sin(theta)
+    faces = np.empty((slices, 3), dtype=np.uint32)
+    faces[:, 0] = 0
+    faces[:, 1] = np.arange(1, slices+1, dtype=np.uint32)
+    faces[:, 2] = faces[:, 1] % slices + 1                         # last rim vertex wraps to 1
+    verts.flags.writeable = False
+    faces.flags.writeable = False
+    return verts, faces
+
 N = 64
-theta = np.linspace(0, 2*np.pi, N, endpoint=False, dtype=np.float32)
-circ = np.column_stack([np.cos(theta), np.sin(theta)])              # (N,2)
-verts2d = np.vstack([[0.0, 0.0], circ])                             # (N+1,2)
-verts = np.zeros((len(verts2d), 3), dtype=np.float32)              # expand to 3D (z=0)
-verts[:, :2] = verts2d
-
-# 2) Triangle‐fan faces
-faces = np.vstack(
-    [ [0, i, i+1] for i in range(1, N) ] +
-    [ [0, N, 1] ]
-).astype(np.uint32)
+verts, faces = _disk_mesh(N)
 
 # 3) Per‐instance data
 M = 200
@@ -26,10 +32,12 @@ M = 200
 instance_positions = np.random.uniform(-5, 5, size=(M, 3)).astype(np.float32)
 
 # 3×3 transforms: we scale X and Y by a random radius
-instance_transforms = np.repeat(np.eye(3, dtype=np.float32)[None, ...], M, axis=0)
+instance_transforms = np.zeros((M, 3, 3), dtype=np.float32)
+diag = np.einsum('mii->mi', instance_transforms)    # writable diagonal view
 radii = np.random.uniform(0.2, 1.0, size=(M,))
-instance_transforms[:, 0, 0] = radii  # scale X
-instance_transforms[:, 1, 1] = radii  # scale Y
+diag[:, 0] = radii  # scale X
+diag[:, 1] = radii  # scale Y
+diag[:, 2] = 1.0
 
 # Optional per‐instance colors
 instance_colors = np.random.uniform(0.3, 1.0, size=(M, 4)).astype(np.float32)
@@ -1,26 +1,46 @@
 import numpy as np
-from vispy import app, scene
-from vispy.scene import visuals, transforms
+from vispy import app, scene, use
+from vispy.geometry import create_sphere
+from vispy.scene.visuals import InstancedMesh
+
+# Enable instancing
+use(gl='gl+')
 
 # 1) Set up canvas + 3D view
 canvas = scene.SceneCanvas(keys='interactive', show=True, bgcolor='white')
 view = canvas.central_widget.add_view()
 view.camera = scene.TurntableCamera(fov=45, distance=6)
 
-# 2) Create some blue spheres
+# 2) Create some blue spheres: one unit-sphere mesh, one instance per
+#    center, drawn in a single call
 radius = 0.5
 centers = [(-1.5, 0, 0), (0, 0, 0), (1.5, 0, 0)]
-spheres = []
-for c in centers:
-    sph = visuals.Sphere(radius=radius, method='latitude',
-                         parent=view.scene, color=(0.5, 0.5, 1, 1))
-    sph.transform = transforms.STTransform(translate=c)
-    spheres.append({'visual': sph, 'center': np.array(c)})
+# packed (N,3) centers, shared by the instances and the hit test
+centers_arr = np.array(centers, dtype=np.float32)
+n_spheres = len(centers_arr)
+
+unit_sphere = create_sphere(rows=30, cols=30, method='latitude')
+sphere_verts = unit_sphere.get_vertices().astype(np.float32)
+sphere_faces = unit_sphere.get_faces().astype(np.uint32)
+
+spheres = InstancedMesh(
+    sphere_verts, sphere_faces,
+    instance_positions=centers_arr,
+    instance_transforms=np.broadcast_to(radius * np.eye(3, dtype=np.float32),
+                                        (n_spheres, 3, 3)),
+    instance_colors=np.tile([0.5, 0.5, 1, 1], (n_spheres, 1)),
+    parent=view.scene
+)
 
-# 3) Create one red “highlight” sphere (initially hidden)
-highlight = visuals.Sphere(radius=radius * 1.1, method='latitude',
-                           parent=view.scene, color=(1, 0, 0, 1))
-highlight.transform = transforms.STTransform(translate=(0, 0, 0))
+# 3) Create one red “highlight” sphere (initially hidden), a single instance
+#    that is moved onto the hit sphere
+highlight = InstancedMesh(
+    sphere_verts, sphere_faces,
+    instance_positions=centers_arr[:1],
+    instance_transforms=(radius * 1.1 * np.eye(3, dtype=np.float32))[None],
+    instance_colors=[(1, 0, 0, 1)],
+    parent=view.scene
+)
 highlight.visible = False
 
 @canvas.events.mouse_press.connect
@@ -35,27 +55,26 @@ def on_mouse_press(event):
     direction = p1[:3] - origin
     direction /= np.linalg.norm(direction)
 
-    # Ray–sphere tests
-    hit_index = None
-    min_t = np.inf
-    for i, obj in enumerate(spheres):
-        C = obj['center']
-        L = origin - C
-        b = np.dot(direction, L)
-        c = np.dot(L, L) - radius**2
-        disc = b * b - c
-        if disc < 0:
-            continue
-        t_hit = -b - np.sqrt(disc)
-        if 0 < t_hit < min_t:
-            min_t = t_hit
-            hit_index = i
+    # Ray–sphere tests against all spheres at once; misses and hits
+    # behind the ray origin get t = inf
+    L = origin - centers_arr
+    b = L @ direction
+    c = np.einsum('ij,ij->i', L, L) - radius**2
+    disc = b * b - c
+    t = np.full(len(centers_arr), np.inf)
+    hit = disc >= 0
+    t[hit] = -b[hit] - np.sqrt(disc[hit])
+    t[t <= 0] = np.inf
+    hit_index = int(np.argmin(t))
+    min_t = t[hit_index]
+    if not np.isfinite(min_t):
+        hit_index = None
 
     # Show or hide the highlight sphere
     if hit_index is not None:
         print(f"Hit sphere {hit_index} at distance {min_t:.3f}")
         # Move and show the red “highlight”
-        highlight.transform.translate = spheres[hit_index]['center']
+        highlight.instance_positions = centers_arr[hit_index:hit_index + 1]
         highlight.visible = True
     else:
         print("No hit")
@@ -51,6 +51,10 @@ plot2d = pg.PlotWidget(title="Membrane Voltage (mV)")
 plot2d.setLabel('bottom', 'Time', units='ms')
 plot2d.setLabel('left', 'Voltage', units='mV')
 plot2d.setBackground('w')
+# draw roughly one point per pixel: peak-preserving decimation of the
+# visible range only, instead of all 5000 samples every frame
+plot2d.setDownsampling(auto=True, mode='peak')
+plot2d.setClipToView(True)
 line2d = plot2d.plot(pen='b')
 
 # 5) Lay them out side by side
@@ -90,8 +94,10 @@ class NeuronWorker(QtCore.QThread):
 
         h.dt = 0.00001     # NEURON time step (ms)
         h.finitialize(-65)  # start at −65 mV
+        steps_per_batch = 1000  # fadvance() calls per yield
         while self.running and self.t < 1000:
-            h.fadvance()
+            for _ in range(steps_per_batch):
+                h.fadvance()
             self.t = float(t_vec[-1])
             self.v = float(v_vec[-1])
             # yield to OS so the UI thread can run
@@ -112,8 +118,15 @@ class MainWindow(QtWidgets.QMainWindow):
         self.sim = NeuronWorker(self)
         self.sim.start()
 
-        self.trace_t = []
-        self.trace_V = []
+        # bounded history as a preallocated ring buffer: head is the next
+        # slot to write, count the number of valid samples
+        self.trace_len = 5000
+        self.trace_t = np.empty(self.trace_len, dtype=np.float64)
+        self.trace_V = np.empty(self.trace_len, dtype=np.float64)
+        self.trace_head  = 0
+        self.trace_count = 0
+        # last 8-bit quantized tube color, to skip repaints that change nothing
+        self._last_q = None
 
         self.ui_timer = QtCore.QTimer(self)
         self.ui_timer.timeout.connect(self.update_frame)
@@ -124,17 +137,27 @@ class MainWindow(QtWidgets.QMainWindow):
         v = self.sim.v
 
         norm = np.clip((v + 80) / 130, 0, 1)
-        r,b = norm, 1.0 - norm
-        color_filter.filter = (r, 0.2, b, 1.0)
-        canvas3d.update()
-
-        self.trace_t.append(t)
-        self.trace_V.append(v)
-
-        if len(self.trace_t) > 5000:
-            self.trace_t.pop(0)
-            self.trace_V.pop(0)
-        line2d.setData(self.trace_t, self.trace_V)
+        q = int(norm * 255)
+        if q != self._last_q:
+            self._last_q = q
+            r,b = norm, 1.0 - norm
+            color_filter.filter = (r, 0.2, b, 1.0)
+            canvas3d.update()
+
+        i = self.trace_head
+        self.trace_t[i] = t
+        self.trace_V[i] = v
+        self.trace_head  = (i + 1) % self.trace_len
+        self.trace_count = min(self.trace_count + 1, self.trace_len)
+
+        if self.trace_count < self.trace_len:
+            n = self.trace_count
+            line2d.setData(self.trace_t[:n], self.trace_V[:n])
+        else:
+            # full: oldest sample sits at head, unroll once per paint
+            head = self.trace_head
+            line2d.setData(np.concatenate([self.trace_t[head:], self.trace_t[:head]]),
+                           np.concatenate([self.trace_V[head:], self.trace_V[:head]]))
 
         if not self.sim.running:
             self.ui_timer.stop()
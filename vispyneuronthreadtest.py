@@ -17,7 +17,7 @@ from neuron import h
 
 # ──────────────── Worker Thread for NEURON ────────────────
 class NeuronWorker(QtCore.QThread):
-    # emits (time_array, voltage_array) each step
+    # emits the (time, voltage, current) samples recorded since the last emit
     data_ready = QtCore.pyqtSignal(object, object, object)
 
     def __init__(self, parent=None):
@@ -25,8 +25,7 @@ class NeuronWorker(QtCore.QThread):
         self._running = True
 
     def run(self):
-        steps_per_emit = 5     # 10 * dt=0.1ms → emit every 1 ms
-        count = 0
+        steps_per_batch = 1000  # fadvance() calls per yield/emit
         # ──────────────── Set up a trivial NEURON model ────────────────
         # Single “soma” section with Hodgkin–Huxley channels
         soma = h.Section(name='soma')
@@ -46,15 +45,18 @@ class NeuronWorker(QtCore.QThread):
 
         h.dt = 0.00005     # NEURON time step (ms)
         h.finitialize(-65)  # start at −65 mV
+        last_len = 0
         while self._running:
-            h.fadvance()
-            count += 1
-            if count >= steps_per_emit:
-                count = 0
-                T = np.array(t_vec)
-                V = np.array(v_vec)
-                I = np.array(i_vec)
-                self.data_ready.emit(T, V, I)
+            for _ in range(steps_per_batch):
+                h.fadvance()
+            # only the new tail; copied since the vectors keep growing
+            # (and may reallocate) while the UI thread holds the arrays
+            n = len(t_vec)
+            T = t_vec.as_numpy()[last_len:n].copy()
+            V = v_vec.as_numpy()[last_len:n].copy()
+            I = i_vec.as_numpy()[last_len:n].copy()
+            last_len = n
+            self.data_ready.emit(T, V, I)
             # yield to OS so the UI thread can run
             self.msleep(0)
 
@@ -101,11 +103,18 @@ class MainWindow(QtWidgets.QMainWindow):
         self.worker.data_ready.connect(self.on_data)
         self.worker.start()
 
+        # last 8-bit quantized tube color, to skip repaints that change nothing
+        self._last_q = None
+
     def on_data(self, T, V, I):
         if T[-1] > 1000:
             self.worker.stop()
         #print(f"T = {T[-1]}, V = {V[-1]}, I={I[-1]}")
         norm = np.clip((V[-1] + 80) / 130, 0.0, 1.0)
+        q = int(norm * 255)
+        if q == self._last_q:
+            return
+        self._last_q = q
         r, b = norm, 1.0 - norm
         color_filter.filter = (r, 0.2, b, 1.0)
         canvas.update()